@@ -2,9 +2,34 @@ import boto3
 import boto3.session
 import typing
 
+import functools
 import importlib
+import logging
+import threading
 
-from dataclasses import dataclass
+from botocore.credentials import RefreshableCredentials
+from botocore.session import get_session
+from dataclasses import dataclass, field
+
+
+logger = logging.getLogger(__name__)
+
+# Assumed role credentials are shared by every AwsClient in the process so
+# that repeated clients for the same role don't each call STS. Refreshable
+# credentials are locked internally, sessions are created per client.
+# Keyed by (role_arn, external_id, role_session_name, region, profile).
+_ASSUME_ROLE_CACHE: typing.Dict[tuple, RefreshableCredentials] = {}
+_ASSUME_ROLE_LOCK = threading.Lock()
+
+
+@functools.lru_cache(maxsize=None)
+def _resolve_service(package, service_name):
+    try:
+        module = importlib.import_module(f".{service_name}", package=package)
+        service = getattr(module, f"{service_name.title()}Service")
+    except (ImportError, AttributeError):
+        raise ValueError(f"Unknown service {service_name}")
+    return service
 
 
 @dataclass
@@ -17,66 +42,90 @@ class AwsClient:
     verbose: bool = False
     
     _session: typing.Optional[boto3.session.Session] = None
-    _sts_client: typing.Optional[boto3.client] = None
-    _role_credentials: typing.Optional[dict] = None
+    _clients: typing.Dict[str, typing.Any] = field(default_factory=dict, repr=False)
 
     @property
     def aws_session(self):
         if self._session is None:
-            self._session = boto3.session.Session(region_name=self.region, profile_name=self.profile)
-            
             # If role ARN is provided, assume the role
             if self.role_arn:
-                if self.verbose:
-                    print(f"Assuming role: {self.role_arn}")
-                
-                self._sts_client = self._session.client('sts')
-                
-                assume_role_kwargs = {
-                    'RoleArn': self.role_arn,
-                    'RoleSessionName': self.role_session_name or 'aws-log-parser-session'
-                }
-                
-                if self.external_id:
-                    assume_role_kwargs['ExternalId'] = self.external_id
-                
-                self._role_credentials = self._sts_client.assume_role(**assume_role_kwargs)['Credentials']
-                
-                # Create a new session with the assumed role credentials
-                self._session = boto3.session.Session(
-                    aws_access_key_id=self._role_credentials['AccessKeyId'],
-                    aws_secret_access_key=self._role_credentials['SecretAccessKey'],
-                    aws_session_token=self._role_credentials['SessionToken'],
-                    region_name=self.region
-                )
-                
-                if self.verbose:
-                    print(f"Successfully assumed role: {self.role_arn}")
-        
+                self._session = self._assumed_role_session()
+            else:
+                self._session = boto3.session.Session(region_name=self.region, profile_name=self.profile)
+
         return self._session
 
+    def _assumed_role_session(self):
+        key = (self.role_arn, self.external_id, self.role_session_name, self.region, self.profile)
+
+        credentials = _ASSUME_ROLE_CACHE.get(key)
+        if credentials is None:
+            with _ASSUME_ROLE_LOCK:
+                # Another thread may have assumed the role while we waited
+                credentials = _ASSUME_ROLE_CACHE.get(key)
+                if credentials is None:
+                    credentials = _ASSUME_ROLE_CACHE[key] = self._assume_role()
+
+        # Sessions are not thread safe, only the credentials are shared
+        botocore_session = get_session()
+        botocore_session._credentials = credentials
+
+        # Create a new session with the assumed role credentials
+        return boto3.session.Session(botocore_session=botocore_session, region_name=self.region)
+
+    def _assume_role(self):
+        logger.info("Assuming role: %s", self.role_arn)
+
+        base_session = boto3.session.Session(region_name=self.region, profile_name=self.profile)
+        sts_client = base_session.client('sts')
+
+        assume_role_kwargs = {
+            'RoleArn': self.role_arn,
+            'RoleSessionName': self.role_session_name or 'aws-log-parser-session'
+        }
+
+        if self.external_id:
+            assume_role_kwargs['ExternalId'] = self.external_id
+
+        def refresh():
+            role_credentials = sts_client.assume_role(**assume_role_kwargs)['Credentials']
+            return {
+                'access_key': role_credentials['AccessKeyId'],
+                'secret_key': role_credentials['SecretAccessKey'],
+                'token': role_credentials['SessionToken'],
+                'expiry_time': role_credentials['Expiration'].isoformat(),
+            }
+
+        # Credentials are assumed again by botocore before they expire, so
+        # long running parses never fail mid stream.
+        credentials = RefreshableCredentials.create_from_metadata(
+            metadata=refresh(),
+            refresh_using=refresh,
+            method='sts-assume-role',
+        )
+
+        logger.info("Successfully assumed role: %s", self.role_arn)
+
+        return credentials
+
     def aws_client(self, service_name):
-        return self.aws_session.client(service_name)
+        # Creating clients is expensive, reuse them
+        client = self._clients.get(service_name)
+        if client is None:
+            client = self._clients[service_name] = self.aws_session.client(service_name)
+        return client
 
     @property
     def ec2_client(self):
-        return self.aws_session.client("ec2")
+        return self.aws_client("ec2")
 
     @property
     def s3_client(self):
-        return self.aws_session.client("s3")
+        return self.aws_client("s3")
 
     def get_service(self, service_name):
-        module = self.__module__.split(".")
-        module.pop(-1)
-        package = ".".join(module)
-
-        try:
-            module = importlib.import_module(f".{service_name}", package=package)
-            service = getattr(module, f"{service_name.title()}Service")
-        except (ImportError, AttributeError):
-            raise ValueError(f"Unknown service {service_name}")
-        return service
+        package = self.__module__.rpartition(".")[0]
+        return _resolve_service(package, service_name)
 
     def service_factory(self, service_name):
         return self.get_service(service_name)(aws_client=self)
@@ -90,6 +139,14 @@ class AwsClient:
             if tag["Key"] == name:
                 return tag["Value"]
 
+    @staticmethod
+    def _tags_to_dict(tags):
+        return {tag["Key"]: tag["Value"] for tag in tags}
+
+    def get_tags(self, tags, names):
+        tags = self._tags_to_dict(tags)
+        return {name: tags.get(name) for name in names}
+
 
 @dataclass
 class AwsService:
@@ -99,3 +156,6 @@ class AwsService:
         for tag in tags:
             if tag["Key"] == name:
                 return tag["Value"]
+
+    def get_tags(self, tags, names):
+        return self.aws_client.get_tags(tags, names)
@@ -1,6 +1,8 @@
 import re
 
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
+from functools import partial
 from io import BytesIO
 
 from .client import (
@@ -8,6 +10,7 @@ from .client import (
     AwsService,
 )
 from ..io import FileIterator
+from ..util import ordered_map
 
 
 @dataclass
@@ -28,17 +31,24 @@ class S3Service(AwsService):
 
         return sorted(items, key=lambda x: x[sort_key], reverse=reverse)
 
-    def read_key(self, bucket, key):
+    def fetch_key(self, client, bucket, key):
         if self.aws_client.verbose:
             print(f"Reading s3://{bucket}/{key}")
-        contents = self.client.get_object(Bucket=bucket, Key=key)
+        contents = client.get_object(Bucket=bucket, Key=key)
+        return contents["Body"].read()
+
+    def iter_lines(self, key, body):
         yield from FileIterator(
-            fileobj=BytesIO(contents["Body"].read()),
+            fileobj=BytesIO(body),
             gzipped=key.endswith(".gz"),
         )
 
-    def read_keys(self, bucket, prefix, endswith=None, regex_filter=None):
+    def read_key(self, bucket, key):
+        yield from self.iter_lines(key, self.fetch_key(self.client, bucket, key))
+
+    def read_keys(self, bucket, prefix, endswith=None, regex_filter=None, max_workers=1):
         reo = re.compile(regex_filter) if regex_filter else None
+        keys = []
         for file in self.list_files(bucket, prefix, "LastModified"):
             if endswith and not file["Key"].endswith(endswith):
                 continue
@@ -46,4 +56,26 @@ class S3Service(AwsService):
             if reo and not reo.match(file["Key"]):
                 continue
 
-            yield from self.read_key(bucket, file["Key"])
+            keys.append(file["Key"])
+
+        if max_workers <= 1:
+            for key in keys:
+                yield from self.read_key(bucket, key)
+            return
+
+        # Clients are thread safe but creating them is not, share one.
+        client = self.client
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            # Workers only download, the bodies are decoded one at a time as
+            # they are consumed so at most max_workers raw files are held.
+            bodies = ordered_map(
+                executor,
+                partial(self.fetch_key, client, bucket),
+                keys,
+                max_workers,
+            )
+            for key, body in zip(keys, bodies):
+                yield from self.iter_lines(key, body)
+        finally:
+            executor.shutdown(cancel_futures=True)
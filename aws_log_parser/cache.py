@@ -1,24 +1,92 @@
+import contextlib
+import dataclasses
+import json
+import logging
 import os
 import pickle
+import struct
+import tempfile
 import hashlib
+import heapq
+import itertools
+import mmap
 import functools
+import threading
 import time
+from collections import OrderedDict
 from pathlib import Path
-from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar, cast
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar, cast
+
+logger = logging.getLogger(__name__)
 
 # Type variable for the return type of the decorated function
 T = TypeVar('T')
 
+# Cached log entry lists can run to hundreds of MB, write them in 1MB chunks
+# rather than the default 8KB.
+BUFFER_SIZE = 1024 * 1024
+
+# Cache files start with a header of a magic identifying how the payload was
+# encoded and the absolute time the entry expires at. Files without a known
+# magic (e.g. written by older versions) are misses.
+PICKLE_MAGIC = b"PKL\x02"
+JSON_MAGIC = b"JSN\x02"
+# A sequence of pickles, one per item, written by Cache.set_stream
+STREAM_MAGIC = b"PKS\x02"
+HEADER = struct.Struct('<4sd')
+
+
+def _json_default(obj: Any) -> Any:
+    """Encode log entries, preferring the dataclasses-json ``to_dict`` encoders"""
+    if hasattr(obj, 'to_dict'):
+        return obj.to_dict()
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _stdlib_json_dumps(value: Any) -> bytes:
+    return json.dumps(value, default=_json_default).encode()
+
+
+def _stdlib_json_loads(data: Any) -> Any:
+    return json.loads(bytes(data))
+
+
+# orjson is optional, fall back to the standard library when it isn't installed
+try:
+    import orjson  # pyright: ignore[reportMissingImports]
+    
+    def _json_dumps(value: Any) -> bytes:
+        return orjson.dumps(value, default=_json_default, option=orjson.OPT_PASSTHROUGH_DATACLASS)
+    
+    _json_loads = orjson.loads
+except ImportError:
+    _json_dumps = _stdlib_json_dumps
+    _json_loads = _stdlib_json_loads
+
+
 class Cache:
     """Cache for AWS Log Parser to avoid unnecessary data pulls"""
     
-    def __init__(self, cache_dir: Optional[str] = None, ttl: int = 3600):
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        ttl: int = 3600,
+        max_entries: Optional[int] = 1000,
+        mem_size: int = 128,
+    ):
         """
         Initialize the cache.
         
         Args:
             cache_dir: Directory to store cache files. Defaults to ~/.aws_log_parser_cache
             ttl: Time to live for cache entries in seconds. Defaults to 1 hour.
+            max_entries: Maximum number of cache entries, the least recently used
+                are evicted first. None disables the limit. Defaults to 1000.
+            mem_size: Number of entries also kept in memory in front of the files.
+                Hits from memory return the same object every time. 0 disables
+                the in memory layer. Defaults to 128.
         """
         if cache_dir is None:
             self.cache_dir = Path.home() / '.aws_log_parser_cache'
@@ -27,20 +95,36 @@ class Cache:
         
         self.cache_dir.mkdir(parents=True, exist_ok=True)
         self.ttl = ttl
+        self.max_entries = max_entries
+        self.mem_size = mem_size
+        # key -> (time the entry expires at, value), least recently used first
+        self._mem_cache: OrderedDict[str, Tuple[float, Any]] = OrderedDict()
+        self._mem_lock = threading.Lock()
+        self._sweeper: Optional[threading.Thread] = None
+        self._sweeper_stop = threading.Event()
     
     def _get_cache_key(self, *args: Any, **kwargs: Any) -> str:
         """Generate a unique cache key based on function arguments"""
-        # Create a string representation of args and kwargs
-        key_parts = [str(arg) for arg in args]
-        key_parts.extend(f"{k}={v}" for k, v in sorted(kwargs.items()))
-        key_str = ":".join(key_parts)
-        
-        # Create a hash of the key string
-        return hashlib.md5(key_str.encode()).hexdigest()
+        key_str = repr((args, tuple(sorted(kwargs.items()))))
+
+        # The key only names a file, a 128 bit digest is plenty.
+        return hashlib.blake2b(key_str.encode(), digest_size=16).hexdigest()
     
     def _get_cache_path(self, key: str) -> Path:
         """Get the path to the cache file for the given key"""
-        return self.cache_dir / f"{key}.pickle"
+        # Shard by the first two characters of the key to keep directories small
+        return self.cache_dir / key[:2] / f"{key}.pickle"
+    
+    def _scan(self, suffix: str = '.pickle') -> Iterator[os.DirEntry]:
+        """Yield the directory entries of all cache files with the given suffix"""
+        with os.scandir(self.cache_dir) as shards:
+            for shard in shards:
+                if not shard.is_dir():
+                    continue
+                with os.scandir(shard.path) as entries:
+                    for entry in entries:
+                        if entry.name.endswith(suffix):
+                            yield entry
     
     def get(self, key: str) -> Tuple[bool, Any]:
         """
@@ -53,59 +137,306 @@ class Cache:
             Tuple of (hit, value) where hit is True if the key was found in the cache
             and value is the cached value (or None if not found)
         """
-        cache_path = self._get_cache_path(key)
+        hit, value = self._mem_get(key)
+        if hit:
+            return hit, value
         
-        if not cache_path.exists():
-            return False, None
-        
-        # Check if cache entry has expired
-        if time.time() - cache_path.stat().st_mtime > self.ttl:
-            return False, None
+        cache_path = self._get_cache_path(key)
         
+        stream = None
         try:
-            with open(cache_path, 'rb') as f:
-                return True, pickle.load(f)
-        except (pickle.PickleError, EOFError):
+            # Unpickle straight from the page cache rather than copying the
+            # file through a read buffer first
+            with open(cache_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                magic, expires_at = HEADER.unpack_from(mm)
+                
+                # Check if cache entry has expired
+                if time.time() > expires_at:
+                    return False, None
+                
+                if magic == STREAM_MAGIC:
+                    # Streams are read lazily, hold the file open so eviction
+                    # can't remove it before the caller iterates
+                    stream = open(cache_path, 'rb', buffering=BUFFER_SIZE)
+                    stream.seek(HEADER.size)
+                elif magic in (PICKLE_MAGIC, JSON_MAGIC):
+                    with memoryview(mm)[HEADER.size:] as payload:
+                        value = pickle.loads(payload) if magic == PICKLE_MAGIC else _json_loads(payload)
+                else:
+                    return False, None
+        except FileNotFoundError:
+            return False, None
+        except (pickle.PickleError, EOFError, ValueError, struct.error):
             # If there's an error loading the cache, treat it as a miss
             return False, None
+        
+        # Record the access for LRU eviction, the file may have been removed
+        # concurrently since it was read
+        with contextlib.suppress(FileNotFoundError):
+            os.utime(cache_path)
+        
+        if stream is not None:
+            return True, self._iter_stream(stream)
+        
+        self._mem_set(key, value, expires_at)
+        return True, value
+    
+    def _iter_stream(self, stream: BinaryIO) -> Iterator[Any]:
+        """Yield the items of a cache file written by ``set_stream``"""
+        with stream:
+            unpickler = pickle.Unpickler(stream)
+            while True:
+                try:
+                    yield unpickler.load()
+                except EOFError:
+                    return
+    
+    def _mem_get(self, key: str) -> Tuple[bool, Any]:
+        """Get a value from the in memory layer"""
+        with self._mem_lock:
+            item = self._mem_cache.get(key)
+            if item is None:
+                return False, None
+            
+            expires_at, value = item
+            if time.time() > expires_at:
+                del self._mem_cache[key]
+                return False, None
+            
+            self._mem_cache.move_to_end(key)
+            return True, value
+    
+    def _mem_set(self, key: str, value: Any, expires_at: float) -> None:
+        """Set a value in the in memory layer, evicting the least recently used"""
+        if self.mem_size <= 0:
+            return
+        
+        with self._mem_lock:
+            self._mem_cache[key] = (expires_at, value)
+            self._mem_cache.move_to_end(key)
+            while len(self._mem_cache) > self.mem_size:
+                self._mem_cache.popitem(last=False)
     
-    def set(self, key: str, value: Any) -> None:
+    def _mem_pop(self, key: str) -> None:
+        """Drop a value from the in memory layer"""
+        with self._mem_lock:
+            self._mem_cache.pop(key, None)
+    
+    def get_json(self, key: str, model: Optional[Any] = None) -> Tuple[bool, Any]:
+        """
+        Get a list of log entries stored with ``set_json``.
+        
+        Args:
+            key: Cache key
+            model: Log entry class used to rebuild the entries with ``from_dict``.
+                Defaults to returning the decoded dicts.
+            
+        Returns:
+            Tuple of (hit, value) as for ``get``
+        """
+        hit, value = self.get(key)
+        if hit and model is not None:
+            value = [model.from_dict(item) if isinstance(item, dict) else item for item in value]
+        return hit, value
+    
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
         """
         Set a value in the cache.
         
         Args:
             key: Cache key
             value: Value to cache
+            ttl: Time to live for this entry in seconds. Defaults to the cache ttl.
+        """
+        expires_at = self._expires_at(ttl)
+        self._write(key, PICKLE_MAGIC, expires_at, lambda f: pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL))
+        self._mem_set(key, value, expires_at)
+    
+    def set_json(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Set a list of log entries in the cache encoded as JSON, using orjson
+        when it is installed. Only suitable for models that round trip through
+        ``to_dict``/``from_dict`` such as ``WafLogEntry``, read them back with
+        ``get_json``.
+        
+        Args:
+            key: Cache key
+            value: Value to cache
+            ttl: Time to live for this entry in seconds. Defaults to the cache ttl.
+        """
+        self._write(key, JSON_MAGIC, self._expires_at(ttl), lambda f: f.write(_json_dumps(value)))
+    
+    def _expires_at(self, ttl: Optional[float]) -> float:
+        """Get the absolute expiry time for an entry written now"""
+        return time.time() + (self.ttl if ttl is None else ttl)
+    
+    def _write(self, key: str, magic: bytes, expires_at: float, dump: Callable[[Any], Any]) -> None:
+        """
+        Write a cache file starting with the header for the given magic.
+        Drops any in memory value for the key, callers holding the value
+        should set it again afterwards.
+        """
+        with self._replace(key) as f:
+            f.write(HEADER.pack(magic, expires_at))
+            dump(f)
+    
+    @contextlib.contextmanager
+    def _replace(self, key: str) -> Iterator[BinaryIO]:
+        """
+        Open a temporary file that replaces the cache file for the key once it
+        is written without error, so readers and sweeps never see a partially
+        written file. Drops any in memory value for the key.
         """
         cache_path = self._get_cache_path(key)
+        cache_path.parent.mkdir(exist_ok=True)
+        
+        fd, tmp_path = tempfile.mkstemp(dir=cache_path.parent, suffix='.tmp')
+        try:
+            with open(fd, 'wb', buffering=BUFFER_SIZE) as f:
+                yield f
+            os.replace(tmp_path, cache_path)
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(tmp_path)
+            raise
+        
+        self._mem_pop(key)
+        self._evict()
+    
+    def set_stream(self, key: str, iterable: Iterable[Any], ttl: Optional[float] = None) -> Iterator[Any]:
+        """
+        Cache the items of an iterable as they are consumed.
+        
+        Items are pickled one at a time so the iterable is never held in
+        memory. The entry is only stored once the iterable is exhausted, a
+        partially consumed stream is discarded.
+        
+        Args:
+            key: Cache key
+            iterable: Items to cache
+            ttl: Time to live for this entry in seconds. Defaults to the cache ttl.
+            
+        Returns:
+            Iterator yielding the items of the iterable
+        """
+        with self._replace(key) as f:
+            f.write(HEADER.pack(STREAM_MAGIC, self._expires_at(ttl)))
+            pickler = pickle.Pickler(f, protocol=pickle.HIGHEST_PROTOCOL)
+            for item in iterable:
+                pickler.dump(item)
+                # The memo would otherwise keep every item alive
+                pickler.clear_memo()
+                yield item
+    
+    def _evict(self) -> None:
+        """Remove the least recently used entries above max_entries"""
+        if self.max_entries is None:
+            return
+        
+        entries = list(self._scan())
+        excess = len(entries) - self.max_entries
+        if excess <= 0:
+            return
         
-        with open(cache_path, 'wb') as f:
-            pickle.dump(value, f)
+        for _, path in heapq.nsmallest(excess, ((entry.stat().st_mtime, entry.path) for entry in entries)):
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(path)
     
     def clear(self) -> None:
         """Clear all cache entries"""
+        with self._mem_lock:
+            self._mem_cache.clear()
+        for entry in itertools.chain(self._scan(), self._scan('.tmp')):
+            # Entries may be removed by a concurrent sweep or eviction
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(entry.path)
+        
+        # Entries from before the cache was sharded are never read, remove them
         for cache_file in self.cache_dir.glob('*.pickle'):
-            cache_file.unlink()
+            with contextlib.suppress(FileNotFoundError):
+                cache_file.unlink()
     
     def clear_expired(self) -> None:
         """Clear expired cache entries"""
-        for cache_file in self.cache_dir.glob('*.pickle'):
-            if time.time() - cache_file.stat().st_mtime > self.ttl:
-                cache_file.unlink()
+        now = time.time()
+        with self._mem_lock:
+            for key, (expires_at, _) in list(self._mem_cache.items()):
+                if now > expires_at:
+                    del self._mem_cache[key]
+        for entry in self._scan():
+            # Entries may be removed by a concurrent clear or sweep
+            with contextlib.suppress(FileNotFoundError):
+                if self._read_expires_at(entry.path) < now:
+                    os.unlink(entry.path)
+        
+        # Writes left behind by a killed process, in flight writes are recent
+        for entry in self._scan('.tmp'):
+            with contextlib.suppress(FileNotFoundError):
+                if now - entry.stat().st_mtime > self.ttl:
+                    os.unlink(entry.path)
+    
+    def _read_expires_at(self, path: str) -> float:
+        """Read the expiry time from a cache file header, 0 if it has none"""
+        with open(path, 'rb') as f:
+            header = f.read(HEADER.size)
+        if len(header) < HEADER.size:
+            return 0
+        magic, expires_at = HEADER.unpack(header)
+        if magic not in (PICKLE_MAGIC, JSON_MAGIC, STREAM_MAGIC):
+            return 0
+        return expires_at
+    
+    def start_sweeper(self, interval: Optional[float] = None) -> None:
+        """
+        Clear expired cache entries periodically in a background thread.
+        
+        Args:
+            interval: Seconds between sweeps. Defaults to a quarter of the ttl.
+        """
+        if interval is None:
+            interval = max(self.ttl // 4, 1)
+        
+        self.stop_sweeper()
+        stop = self._sweeper_stop = threading.Event()
+        
+        def sweep() -> None:
+            while not stop.wait(interval):
+                self.clear_expired()
+        
+        self._sweeper = threading.Thread(target=sweep, name='aws-log-parser-cache-sweeper', daemon=True)
+        self._sweeper.start()
+    
+    def stop_sweeper(self) -> None:
+        """Stop the background sweeper if it is running"""
+        if self._sweeper is not None:
+            self._sweeper_stop.set()
+            self._sweeper.join()
+            self._sweeper = None
 
 
-def cached(ttl: int = 3600, cache_dir: Optional[str] = None) -> Callable[[Callable[..., T]], Callable[..., T]]:
+def cached(
+    ttl: int = 3600,
+    cache_dir: Optional[str] = None,
+    max_entries: Optional[int] = 1000,
+    mem_size: int = 128,
+    key_fn: Optional[Callable[..., Any]] = None,
+) -> Callable[[Callable[..., T]], Callable[..., T]]:
     """
     Decorator to cache function results.
     
     Args:
         ttl: Time to live for cache entries in seconds. Defaults to 1 hour.
         cache_dir: Directory to store cache files. Defaults to ~/.aws_log_parser_cache
+        max_entries: Maximum number of cache entries. Defaults to 1000.
+        mem_size: Number of entries also kept in memory. Defaults to 128.
+        key_fn: Optional function called with the same arguments as the decorated
+            function returning a stable key, e.g. ``lambda self, bucket, key: f"{bucket}/{key}"``.
+            Defaults to a key built from all the arguments.
         
     Returns:
         Decorated function that uses caching
     """
-    cache = Cache(cache_dir=cache_dir, ttl=ttl)
+    cache = Cache(cache_dir=cache_dir, ttl=ttl, max_entries=max_entries, mem_size=mem_size)
     
     def decorator(func: Callable[..., T]) -> Callable[..., T]:
         @functools.wraps(func)
@@ -114,26 +445,30 @@ def cached(ttl: int = 3600, cache_dir: Optional[str] = None) -> Callable[[Callab
             force_refresh = kwargs.pop('force_refresh', False)
             
             # Generate cache key
-            cache_key = cache._get_cache_key(func.__name__, *args, **kwargs)
+            if key_fn is not None:
+                cache_key = cache._get_cache_key(func.__name__, key_fn(*args, **kwargs))
+            else:
+                cache_key = cache._get_cache_key(func.__name__, *args, **kwargs)
             
             if not force_refresh:
                 # Try to get from cache
                 hit, value = cache.get(cache_key)
                 if hit:
-                    if args and hasattr(args[0], 'verbose') and args[0].verbose:
-                        print(f"Using cached data for {func.__name__}")
+                    logger.debug("Using cached data for %s", func.__name__)
                     return value
             
             # Call the function and cache the result
             result = func(*args, **kwargs)
             
-            # For generators, we need to materialize the results
-            if hasattr(result, '__iter__') and not isinstance(result, (list, tuple, dict)):
-                result = list(result)
+            # Cache generators as they are consumed rather than materializing them
+            if isinstance(result, Iterator):
+                return cast(T, cache.set_stream(cache_key, result))
             
             cache.set(cache_key, result)
             return result
         
+        # Expose the cache, e.g. to clear it or start a sweeper
+        wrapper.cache = cache  # type: ignore[attr-defined]
         return wrapper
     
     return decorator 
\ No newline at end of file
@@ -102,6 +102,8 @@ def main():
 
     args = parser.parse_args()
 
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+
     log_entries = AwsLogParser(
         log_type=args.log_type,
         profile=args.profile,
@@ -35,6 +35,7 @@ class AwsLogParser:
     regex_filter: typing.Optional[str] = None
     verbose: bool = False
     cache_ttl: int = 3600  # Cache TTL in seconds (default: 1 hour)
+    max_workers: int = 4  # Number of S3 files downloaded concurrently
 
     plugin_paths: typing.List[typing.Union[str, Path]] = field(default_factory=list)
     plugins: typing.List[str] = field(default_factory=list)
@@ -158,6 +159,7 @@ class AwsLogParser:
                 prefix,
                 endswith=endswith if endswith else self.file_suffix,
                 regex_filter=self.regex_filter,
+                max_workers=self.max_workers,
             )
         )
 
@@ -188,12 +190,12 @@ class AwsLogParser:
         parsed = urlparse(url)
 
         if parsed.scheme == "file":
-            return list(self.read_files(parsed.path))
+            yield from self.read_files(parsed.path)
 
         elif parsed.scheme == "s3":
-            return list(self.read_s3(
+            yield from self.read_s3(
                 parsed.netloc,
                 parsed.path.lstrip("/"),
-            ))
+            )
         else:
             raise ValueError(f"Unknown scheme {parsed.scheme}")
@@ -1,3 +1,4 @@
+from collections import deque
 from itertools import islice
 
 
@@ -5,3 +6,21 @@ def batcher(iterable, batch_size):
     iterator = iter(iterable)
     while batch := list(islice(iterator, batch_size)):
         yield batch
+
+
+def ordered_map(executor, func, iterable, window):
+    """
+    Like ``executor.map`` but with at most ``window`` calls in flight,
+    yielding the results in order as they complete.
+    """
+    pending = deque()
+    try:
+        for item in iterable:
+            pending.append(executor.submit(func, item))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
@@ -1,6 +1,7 @@
 #!/bin/env python
 
 import argparse
+import logging
 import textwrap
 
 from collections import Counter
@@ -10,7 +11,8 @@ from aws_log_parser import AwsLogParser, LogType
 
 
 def count_ips(entries, ip_attr):
-    counter = Counter(attrgetter(ip_attr)(entry) for entry in entries)
+    counter = Counter()
+    counter.update(map(attrgetter(ip_attr), entries))
 
     for ip, count in sorted(counter.items()):
         print(f"{ip}: {count}")
@@ -101,6 +103,13 @@ Examples:
         help="External ID to use when assuming the role (if required).",
     )
 
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=32,
+        help="The number of S3 files to download concurrently.",
+    )
+
     parser.add_argument(
         "--verbose",
         action="store_true",
@@ -109,6 +118,8 @@ Examples:
 
     args = parser.parse_args()
 
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+
     ip_attr = "client_ip" if args.log_type == LogType.CloudFront else "client.ip"
 
     entries = AwsLogParser(
@@ -121,6 +132,7 @@ Examples:
         verbose=args.verbose,
         file_suffix=args.file_suffix,
         regex_filter=args.regex_filter,
+        max_workers=args.max_workers,
     ).read_url(args.url)
 
     count_ips(entries, ip_attr)
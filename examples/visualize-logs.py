@@ -1,8 +1,10 @@
 #!/bin/env python
 
+import logging
 import os
 import sys
 from collections import Counter
+from operator import attrgetter
 from pathlib import Path
 
 # Add the parent directory to the Python path to import aws_log_parser
@@ -27,21 +29,79 @@ LIMIT = 10
 FILE_SUFFIX = ".log.gz"  # Updated suffix for WAF logs
 VERBOSE = True  # Set to True to see more details
 CACHE_TTL = int(os.getenv("CACHE_TTL", "3600"))  # Cache TTL in seconds (default: 1 hour)
+MAX_WORKERS = int(os.getenv("MAX_WORKERS", "32"))  # S3 files downloaded concurrently
 FORCE_REFRESH = os.getenv("FORCE_REFRESH", "").lower() in ("true", "1", "yes")  # Force refresh cache
 
 console = Console()
 
-def visualize_user_agents(entries, limit=10):
-    """Display top user agents in a rich table"""
-    counter = Counter()
+# Fields read from every WAF log entry
+GET_ACTION_AND_REQUEST = attrgetter('action', 'httpRequest')
+GET_REQUEST_FIELDS = attrgetter('httpMethod', 'clientIp', 'country', 'uri', 'headers')
+
+def collect_all(entries):
+    """
+    Count every visualized field in a single pass over the entries.
+
+    The entries are only iterated once so they can be streamed, returns the
+    counters and the number of entries seen.
+    """
+    counters = {
+        name: Counter()
+        for name in (
+            "hosts",
+            "uris",
+            "user_agents",
+            "http_methods",
+            "actions",
+            "client_ips",
+            "countries",
+        )
+    }
+    hosts = counters["hosts"]
+    uris = counters["uris"]
+    user_agents = counters["user_agents"]
+    http_methods = counters["http_methods"]
+    actions = counters["actions"]
+    client_ips = counters["client_ips"]
+    countries = counters["countries"]
+    n_entries = 0
+
     for entry in entries:
-        # For WAF logs, user agent is in the headers
-        if hasattr(entry, 'httpRequest') and hasattr(entry.httpRequest, 'headers'):
-            for header in entry.httpRequest.headers:
-                if header.name.lower() == 'user-agent':
-                    counter[header.value] += 1
-                    break
-    
+        n_entries += 1
+
+        # The WAF schema is fixed, skip anything that isn't a WAF entry
+        try:
+            action, request = GET_ACTION_AND_REQUEST(entry)
+        except AttributeError:
+            continue
+
+        method, client_ip, country, uri, headers = GET_REQUEST_FIELDS(request)
+        actions[action] += 1
+        http_methods[method] += 1
+        client_ips[client_ip] += 1
+        countries[country] += 1
+        # Simplify URI by removing query parameters
+        uris[uri.split('?')[0]] += 1
+
+        # Host and user agent are in the headers, count the first of each
+        host = user_agent = None
+        for header in headers:
+            name = header.name.lower()
+            if name == 'host' and host is None:
+                host = header.value
+            elif name == 'user-agent' and user_agent is None:
+                user_agent = header.value
+            if host is not None and user_agent is not None:
+                break
+        if host is not None:
+            hosts[host] += 1
+        if user_agent is not None:
+            user_agents[user_agent] += 1
+
+    return counters, n_entries
+
+def visualize_user_agents(counter, limit=10):
+    """Display top user agents in a rich table"""
     table = Table(title=f"Top {limit} User Agents", show_header=True)
     table.add_column("Rank", justify="right", style="cyan")
     table.add_column("User Agent", style="green")
@@ -65,14 +125,8 @@ def visualize_user_agents(entries, limit=10):
     
     console.print(table)
 
-def visualize_http_methods(entries):
+def visualize_http_methods(counter):
     """Display HTTP methods usage in a rich table"""
-    counter = Counter()
-    for entry in entries:
-        # For WAF logs, method is in httpRequest
-        if hasattr(entry, 'httpRequest') and hasattr(entry.httpRequest, 'httpMethod'):
-            counter[entry.httpRequest.httpMethod] += 1
-    
     table = Table(title="HTTP Methods", show_header=True)
     table.add_column("Method", style="blue")
     table.add_column("Count", justify="right", style="magenta")
@@ -92,13 +146,8 @@ def visualize_http_methods(entries):
     
     console.print(table)
 
-def visualize_actions(entries):
+def visualize_actions(counter):
     """Display WAF actions in a rich table"""
-    counter = Counter()
-    for entry in entries:
-        if hasattr(entry, 'action'):
-            counter[entry.action] += 1
-    
     table = Table(title="WAF Actions", show_header=True)
     table.add_column("Action", style="blue")
     table.add_column("Count", justify="right", style="magenta")
@@ -128,14 +177,8 @@ def visualize_actions(entries):
     
     console.print(table)
 
-def visualize_client_ips(entries, limit=10):
+def visualize_client_ips(counter, limit=10):
     """Display top client IPs in a rich table"""
-    counter = Counter()
-    for entry in entries:
-        # For WAF logs, client IP is in httpRequest
-        if hasattr(entry, 'httpRequest') and hasattr(entry.httpRequest, 'clientIp'):
-            counter[entry.httpRequest.clientIp] += 1
-    
     table = Table(title=f"Top {limit} Client IPs", show_header=True)
     table.add_column("Rank", justify="right", style="cyan")
     table.add_column("IP Address", style="green")
@@ -157,14 +200,8 @@ def visualize_client_ips(entries, limit=10):
     
     console.print(table)
 
-def visualize_countries(entries, limit=10):
+def visualize_countries(counter, limit=10):
     """Display top countries in a rich table"""
-    counter = Counter()
-    for entry in entries:
-        # For WAF logs, country is in httpRequest
-        if hasattr(entry, 'httpRequest') and hasattr(entry.httpRequest, 'country'):
-            counter[entry.httpRequest.country] += 1
-    
     table = Table(title=f"Top {limit} Countries", show_header=True)
     table.add_column("Rank", justify="right", style="cyan")
     table.add_column("Country", style="green")
@@ -186,17 +223,8 @@ def visualize_countries(entries, limit=10):
     
     console.print(table)
 
-def visualize_hosts(entries, limit=10):
+def visualize_hosts(counter, limit=10):
     """Display top hosts in a rich table (similar to count-hosts functionality)"""
-    counter = Counter()
-    for entry in entries:
-        # For WAF logs, host is in the headers
-        if hasattr(entry, 'httpRequest') and hasattr(entry.httpRequest, 'headers'):
-            for header in entry.httpRequest.headers:
-                if header.name.lower() == 'host':
-                    counter[header.value] += 1
-                    break
-    
     table = Table(title=f"Top {limit} Hosts", show_header=True)
     table.add_column("Rank", justify="right", style="cyan")
     table.add_column("Host", style="green")
@@ -218,15 +246,8 @@ def visualize_hosts(entries, limit=10):
     
     console.print(table)
 
-def visualize_uris(entries, limit=10):
+def visualize_uris(counter, limit=10):
     """Display top URIs in a rich table"""
-    counter = Counter()
-    for entry in entries:
-        if hasattr(entry, 'httpRequest') and hasattr(entry.httpRequest, 'uri'):
-            # Simplify URI by removing query parameters
-            uri = entry.httpRequest.uri.split('?')[0]
-            counter[uri] += 1
-    
     table = Table(title=f"Top {limit} URIs", show_header=True)
     table.add_column("Rank", justify="right", style="cyan")
     table.add_column("URI", style="green")
@@ -251,6 +272,8 @@ def visualize_uris(entries, limit=10):
     console.print(table)
 
 def main():
+    logging.basicConfig(level=logging.INFO if VERBOSE else logging.WARNING)
+    
     if not S3_PATH:
         console.print("[bold red]Error:[/bold red] S3_URL not found in .env file")
         return
@@ -281,37 +304,40 @@ def main():
             verbose=VERBOSE,
             file_suffix=FILE_SUFFIX,
             cache_ttl=CACHE_TTL,
+            max_workers=MAX_WORKERS,
         )
         
         try:
-            # Convert generator to list to process multiple times
-            entries = log_parser.read_url(S3_PATH, force_refresh=FORCE_REFRESH)
+            # Count everything in a single pass without holding on to the entries
+            counters, n_entries = collect_all(
+                log_parser.read_url(S3_PATH, force_refresh=FORCE_REFRESH)
+            )
             progress.update(task, description="[bold green]Logs loaded successfully!")
             
-            console.print(f"\n[bold]Analyzed [cyan]{len(entries):,}[/cyan] log entries[/bold]\n")
+            console.print(f"\n[bold]Analyzed [cyan]{n_entries:,}[/cyan] log entries[/bold]\n")
             
             # Display host information (count-hosts functionality)
-            visualize_hosts(entries, LIMIT)
+            visualize_hosts(counters["hosts"], LIMIT)
             console.print()
             
             # Display URI information
-            visualize_uris(entries, LIMIT)
+            visualize_uris(counters["uris"], LIMIT)
             console.print()
             
             # Display visualizations
-            visualize_user_agents(entries, LIMIT)
+            visualize_user_agents(counters["user_agents"], LIMIT)
             console.print()
             
-            visualize_http_methods(entries)
+            visualize_http_methods(counters["http_methods"])
             console.print()
             
-            visualize_actions(entries)  # WAF-specific visualization
+            visualize_actions(counters["actions"])  # WAF-specific visualization
             console.print()
             
-            visualize_client_ips(entries, LIMIT)
+            visualize_client_ips(counters["client_ips"], LIMIT)
             console.print()
             
-            visualize_countries(entries, LIMIT)  # WAF-specific visualization
+            visualize_countries(counters["countries"], LIMIT)  # WAF-specific visualization
             
         except Exception as e:
             progress.update(task, description=f"[bold red]Error: {str(e)}")
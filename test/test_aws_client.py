@@ -0,0 +1,115 @@
+import datetime
+
+import pytest
+
+from aws_log_parser.aws import client as aws_client_module
+from aws_log_parser.aws import AwsClient
+
+
+class MockStsClient:
+    def __init__(self, expires_in=datetime.timedelta(hours=1)):
+        self.calls = 0
+        self.expires_in = expires_in
+
+    def assume_role(self, **_):
+        self.calls += 1
+        return {
+            "Credentials": {
+                "AccessKeyId": "access-key",
+                "SecretAccessKey": "secret-key",
+                "SessionToken": f"token-{self.calls}",
+                "Expiration": datetime.datetime.now(datetime.timezone.utc)
+                + self.expires_in,
+            }
+        }
+
+
+class MockSession:
+    sts = MockStsClient()
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+
+    def client(self, service_name):
+        assert service_name == "sts"
+        return self.sts
+
+    @property
+    def credentials(self):
+        return self.kwargs["botocore_session"].get_credentials()
+
+
+@pytest.fixture
+def mock_session(monkeypatch):
+    MockSession.sts = MockStsClient()
+    monkeypatch.setattr(aws_client_module.boto3.session, "Session", MockSession)
+    monkeypatch.setattr(aws_client_module, "_ASSUME_ROLE_CACHE", {})
+    return MockSession
+
+
+def test_assume_role_shared_between_clients(mock_session):
+    role_arn = "arn:aws:iam::123456789012:role/LogReaderRole"
+    first = AwsClient(role_arn=role_arn).aws_session
+    second = AwsClient(role_arn=role_arn).aws_session
+
+    assert first is not second
+    assert first.credentials is second.credentials
+    assert first.credentials.token == "token-1"
+    assert mock_session.sts.calls == 1
+
+
+def test_assume_role_per_role(mock_session):
+    AwsClient(role_arn="arn:aws:iam::123456789012:role/One").aws_session
+    AwsClient(role_arn="arn:aws:iam::123456789012:role/Two").aws_session
+    assert mock_session.sts.calls == 2
+
+
+def test_assume_role_refreshes_credentials(mock_session):
+    mock_session.sts = MockStsClient(expires_in=datetime.timedelta(minutes=1))
+    session = AwsClient(role_arn="arn:aws:iam::123456789012:role/LogReaderRole").aws_session
+
+    assert session.credentials.get_frozen_credentials().token == "token-2"
+    assert mock_session.sts.calls == 2
+
+
+def test_get_service():
+    from aws_log_parser.aws.s3 import S3Service
+
+    assert AwsClient().get_service("s3") is S3Service
+
+
+def test_get_service_unknown():
+    with pytest.raises(ValueError):
+        AwsClient().get_service("unknown")
+
+
+class CountingSession:
+    def __init__(self):
+        self.created = []
+
+    def client(self, service_name):
+        self.created.append(service_name)
+        return object()
+
+
+def test_aws_client_reused():
+    session = CountingSession()
+    aws_client = AwsClient(_session=session)
+
+    assert aws_client.s3_client is aws_client.s3_client
+    assert aws_client.aws_client("s3") is aws_client.s3_client
+    assert aws_client.ec2_client is not aws_client.s3_client
+    assert session.created == ["s3", "ec2"]
+
+
+def test_get_tags():
+    tags = [
+        {"Key": "Name", "Value": "web-1"},
+        {"Key": "aws:ecs:serviceName", "Value": "web"},
+    ]
+    assert AwsClient().get_tags(tags, ["Name", "aws:ecs:serviceName", "Missing"]) == {
+        "Name": "web-1",
+        "aws:ecs:serviceName": "web",
+        "Missing": None,
+    }
+    assert AwsClient().get_tag(tags, "Name") == "web-1"
@@ -0,0 +1,331 @@
+import os
+import pickle
+import time
+
+import pytest
+
+from aws_log_parser import AwsLogParser, LogType
+from aws_log_parser import cache as cache_module
+from aws_log_parser.cache import HEADER, JSON_MAGIC, PICKLE_MAGIC, STREAM_MAGIC, Cache, cached
+from aws_log_parser.models import WafLogEntry
+
+
+@pytest.fixture
+def cache(tmp_path):
+    # Disable the in memory layer to exercise the cache files
+    return Cache(cache_dir=str(tmp_path), mem_size=0)
+
+
+def test_cache_roundtrip(cache):
+    cache.set("key", [1, 2, 3])
+    assert cache.get("key") == (True, [1, 2, 3])
+
+
+def test_cache_miss(cache):
+    assert cache.get("missing") == (False, None)
+
+
+def test_cache_highest_protocol(cache):
+    cache.set("key", {"a": 1})
+    contents = cache._get_cache_path("key").read_bytes()
+    assert contents.startswith(PICKLE_MAGIC)
+    assert contents[HEADER.size + 1] == pickle.HIGHEST_PROTOCOL
+
+
+def test_cache_unknown_format(cache):
+    cache.set("key", "placeholder")
+    cache._get_cache_path("key").write_bytes(pickle.dumps("value"))
+    assert cache.get("key") == (False, None)
+
+
+def test_cache_expired(tmp_path):
+    cache = Cache(cache_dir=str(tmp_path), ttl=-1)
+    cache.set("key", "value")
+    assert cache.get("key") == (False, None)
+
+
+def test_cache_clear(cache):
+    cache.set("one", 1)
+    cache.set("two", 2)
+    cache.clear()
+    assert cache.get("one") == (False, None)
+    assert cache.get("two") == (False, None)
+
+
+def test_cached_decorator(tmp_path):
+    calls = []
+
+    @cached(cache_dir=str(tmp_path))
+    def double(value):
+        calls.append(value)
+        return value * 2
+
+    assert double(2) == 4
+    assert double(2) == 4
+    assert calls == [2]
+
+    assert double(2, force_refresh=True) == 4
+    assert calls == [2, 2]
+
+
+def test_cached_key_fn(tmp_path):
+    calls = []
+
+    @cached(cache_dir=str(tmp_path), key_fn=lambda value, ignored: value)
+    def double(value, ignored):
+        calls.append(value)
+        return value * 2
+
+    assert double(2, object()) == 4
+    assert double(2, object()) == 4
+    assert calls == [2]
+
+
+def test_cache_key_kwargs_order(cache):
+    assert cache._get_cache_key("func", a=1, b=2) == cache._get_cache_key("func", b=2, a=1)
+    assert cache._get_cache_key("func", 1) != cache._get_cache_key("func", "1")
+
+
+def test_cache_sharded(cache, tmp_path):
+    cache.set("abcdef", "value")
+    assert cache._get_cache_path("abcdef") == tmp_path / "ab" / "abcdef.pickle"
+    assert cache._get_cache_path("abcdef").exists()
+
+
+def test_cache_clear_expired(cache):
+    cache.set("fresh", 1)
+    cache.set("stale", 2, ttl=-1)
+    stale_path = cache._get_cache_path("stale")
+
+    cache.clear_expired()
+
+    assert cache.get("fresh") == (True, 1)
+    assert not stale_path.exists()
+
+
+def test_cache_sweeper(cache):
+    cache.set("stale", 1, ttl=-1)
+    stale_path = cache._get_cache_path("stale")
+
+    cache.start_sweeper(interval=0.01)
+    try:
+        for _ in range(100):
+            if not stale_path.exists():
+                break
+            time.sleep(0.01)
+    finally:
+        cache.stop_sweeper()
+
+    assert not stale_path.exists()
+    assert cache._sweeper is None
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = Cache(cache_dir=str(tmp_path), max_entries=2, mem_size=0)
+    cache.set("first", 1)
+    cache.set("second", 2)
+    os.utime(cache._get_cache_path("first"), (1, 1))
+    os.utime(cache._get_cache_path("second"), (2, 2))
+
+    # Reading first makes second the least recently used, sweeping must not
+    # change that
+    assert cache.get("first") == (True, 1)
+    cache.clear_expired()
+    cache.set("third", 3)
+
+    assert cache.get("first") == (True, 1)
+    assert cache.get("second") == (False, None)
+    assert cache.get("third") == (True, 3)
+
+
+def test_cache_expiry_ignores_mtime(cache):
+    cache.set("stale", 1, ttl=-1)
+    cache.set("fresh", 2)
+    # e.g. restored from a backup
+    os.utime(cache._get_cache_path("stale"))
+    os.utime(cache._get_cache_path("fresh"), (0, 0))
+
+    assert cache.get("stale") == (False, None)
+    assert cache.get("fresh") == (True, 2)
+
+
+def test_cache_per_entry_ttl(tmp_path):
+    cache = Cache(cache_dir=str(tmp_path), ttl=-1)
+    cache.set("key", 1, ttl=60)
+    assert cache.get("key") == (True, 1)
+    assert cache._mem_get("key") == (True, 1)
+
+
+def test_cache_memory_hit(tmp_path):
+    cache = Cache(cache_dir=str(tmp_path))
+    value = [1, 2, 3]
+    cache.set("key", value)
+    cache._get_cache_path("key").unlink()
+
+    hit, cached_value = cache.get("key")
+    assert hit
+    assert cached_value is value
+
+
+def test_cache_memory_populated_from_disk(tmp_path):
+    Cache(cache_dir=str(tmp_path)).set("key", [1, 2, 3])
+
+    cache = Cache(cache_dir=str(tmp_path))
+    first = cache.get("key")[1]
+    assert cache.get("key")[1] is first
+
+
+def test_cache_memory_lru(tmp_path):
+    cache = Cache(cache_dir=str(tmp_path), mem_size=2)
+    cache.set("first", 1)
+    cache.set("second", 2)
+    cache.get("first")
+    cache.set("third", 3)
+
+    assert list(cache._mem_cache) == ["first", "third"]
+
+
+def test_cache_memory_expired(tmp_path):
+    cache = Cache(cache_dir=str(tmp_path), ttl=-1)
+    cache.set("key", 1)
+    assert cache._mem_get("key") == (False, None)
+
+
+def test_cache_memory_clear(tmp_path):
+    cache = Cache(cache_dir=str(tmp_path))
+    cache.set("key", 1)
+    cache.clear()
+    assert cache.get("key") == (False, None)
+
+
+def test_cache_empty_file(cache):
+    cache.set("key", "placeholder")
+    cache._get_cache_path("key").write_bytes(b"")
+    assert cache.get("key") == (False, None)
+
+
+@pytest.fixture(params=["default", "stdlib"])
+def json_backend(request, monkeypatch):
+    if request.param == "stdlib":
+        monkeypatch.setattr(cache_module, "_json_dumps", cache_module._stdlib_json_dumps)
+        monkeypatch.setattr(cache_module, "_json_loads", cache_module._stdlib_json_loads)
+    return request.param
+
+
+def test_cache_json_roundtrip(cache, waf_entry_json, json_backend):
+    entries = list(AwsLogParser(LogType.WAF).parse([waf_entry_json]))
+    cache.set_json("key", entries)
+
+    assert cache._get_cache_path("key").read_bytes().startswith(JSON_MAGIC)
+    assert cache.get_json("key", WafLogEntry) == (True, entries)
+
+    hit, value = cache.get("key")
+    assert hit
+    assert value[0]["httpRequest"]["clientIp"] == entries[0].httpRequest.clientIp
+
+
+def test_cache_stream_roundtrip(cache):
+    assert list(cache.set_stream("key", iter([1, 2, 3]))) == [1, 2, 3]
+    assert cache._get_cache_path("key").read_bytes().startswith(STREAM_MAGIC)
+
+    hit, value = cache.get("key")
+    assert hit
+    assert list(value) == [1, 2, 3]
+
+
+def test_cache_stream_partial(cache):
+    stream = cache.set_stream("key", iter([1, 2, 3]))
+    assert next(stream) == 1
+    stream.close()
+
+    assert cache.get("key") == (False, None)
+    assert list(cache._get_cache_path("key").parent.iterdir()) == []
+
+
+def test_cached_generator(tmp_path):
+    calls = []
+
+    @cached(cache_dir=str(tmp_path))
+    def count(n):
+        calls.append(n)
+        yield from range(n)
+
+    result = count(3)
+    assert not isinstance(result, list)
+    assert list(result) == [0, 1, 2]
+    assert list(count(3)) == [0, 1, 2]
+    assert calls == [3]
+
+
+def test_cache_set_json_replaces_memory(tmp_path):
+    cache = Cache(cache_dir=str(tmp_path))
+    cache.set("key", [1])
+    cache.set_json("key", [2])
+
+    assert cache.get("key") == (True, [2])
+    assert Cache(cache_dir=str(tmp_path)).get("key") == (True, [2])
+
+
+def test_cache_set_stream_replaces_memory(tmp_path):
+    cache = Cache(cache_dir=str(tmp_path))
+    cache.set("key", [1])
+    assert list(cache.set_stream("key", iter([9]))) == [9]
+
+    hit, value = cache.get("key")
+    assert hit
+    assert list(value) == [9]
+
+
+def test_cached_refresh_to_generator(tmp_path):
+    results = [[1], iter([9])]
+
+    @cached(cache_dir=str(tmp_path))
+    def fetch():
+        return results.pop(0)
+
+    assert fetch() == [1]
+    assert list(fetch(force_refresh=True)) == [9]
+    assert list(fetch()) == [9]
+
+
+def test_cache_write_failure_keeps_entry(cache):
+    cache.set("key", 1)
+
+    class Unpicklable:
+        def __reduce__(self):
+            raise pickle.PicklingError("nope")
+
+    with pytest.raises(pickle.PicklingError):
+        cache.set("key", Unpicklable())
+
+    assert cache.get("key") == (True, 1)
+    assert [path.suffix for path in cache._get_cache_path("key").parent.iterdir()] == [".pickle"]
+
+
+def test_cache_clear_unsharded(cache, tmp_path):
+    legacy_path = tmp_path / "0123456789abcdef.pickle"
+    legacy_path.write_bytes(pickle.dumps("value"))
+
+    cache.clear()
+
+    assert not legacy_path.exists()
+
+
+def test_cache_clear_expired_stale_tmp(cache):
+    cache.set("key", 1)
+    shard = cache._get_cache_path("key").parent
+    stale_path = shard / "stale.tmp"
+    stale_path.write_bytes(b"partial")
+    os.utime(stale_path, (0, 0))
+    fresh_path = shard / "fresh.tmp"
+    fresh_path.write_bytes(b"in flight")
+
+    cache.clear_expired()
+
+    assert not stale_path.exists()
+    assert fresh_path.exists()
+    assert cache.get("key") == (True, 1)
+
+    cache.clear()
+
+    assert not fresh_path.exists()
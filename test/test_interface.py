@@ -107,6 +107,22 @@ def test_parse_s3(monkeypatch, cloudfront_parser, gzipped=False):
     assert len(list(entries)) == 6
 
 
+def test_parse_s3_concurrent(monkeypatch):
+    monkeypatch.setattr(S3Service, "client", MockS3Client())
+    entries = {
+        max_workers: list(
+            AwsLogParser(
+                log_type=LogType.CloudFront,
+                file_suffix="",
+                max_workers=max_workers,
+            ).read_s3("bucket", "key")
+        )
+        for max_workers in (1, 4)
+    }
+    assert len(entries[4]) == 12
+    assert entries[4] == entries[1]
+
+
 def test_parse_s3_gzipped(monkeypatch, cloudfront_parser):
     gzipped = True
     monkeypatch.setattr(S3Service, "client", MockS3Client(gzipped=gzipped))